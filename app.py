@@ -1,36 +1,118 @@
-from google.cloud import storage
-from flask import Flask, request, abort, jsonify, make_response
+from flask import Flask, Response, request, abort
 import hmac
 import hashlib
 import json
+import logging
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import random
+import re
 import time
 import datetime
+import urllib.parse
+import collections
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging():
+    """Configure the root logger from LOG_LEVEL.
+
+    Called by each entry point (gunicorn's post_worker_init hook, the CLIs'
+    main and the development server), never at import.
+    """
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
 
 app = Flask(__name__)
+# Refuse oversized bodies (413) before they are buffered. The status and
+# check_run payloads handled here are a few tens of KB.
+app.config["MAX_CONTENT_LENGTH"] = 5 * 1024 * 1024
 
 GITHUB_SECRET = os.getenv("GITHUB_SECRET")
-LOGILICA_TOKEN = os.getenv("LOGILICA_TOKEN")
+# Encoded once; used as the HMAC key for every webhook
+GITHUB_SECRET_BYTES = GITHUB_SECRET.encode("utf-8") if GITHUB_SECRET else None
+
+
+# Public Prow artifacts are plain objects on the GCS XML endpoint, so they are
+# fetched with a pooled keep-alive session rather than a storage client.
+GCS_OBJECT_URL = "https://storage.googleapis.com/{}/{}"
+GCS_TIMEOUT = 30  # seconds
+
+gcs_session = requests.Session()
+gcs_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]
+        ),
+    ),
+)
 
 
 def download_single_file_from_gcs(bucket_name: str, source_blob_name: str) -> bytes:
-    """Downloads a file from Google Cloud Storage.
+    """Downloads a file from a public Google Cloud Storage bucket.
 
     Args:
         bucket_name: The name of the GCS bucket.
         source_blob_name: The GCS blob to download.
     """
+    url = GCS_OBJECT_URL.format(bucket_name, urllib.parse.quote(source_blob_name))
     try:
-        storage_client = storage.Client.create_anonymous_client()
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(source_blob_name)
-        return blob.download_as_bytes()
+        response = gcs_session.get(url, timeout=GCS_TIMEOUT)
+        response.raise_for_status()
+        return response.content
     except Exception as e:
-        print(f"Error downloading from GCS: {str(e)}")
+        logger.error("Error downloading from GCS: %s", e)
         raise
 
 
+def download_build_json(bucket_name: str, prefix: str) -> tuple[dict, dict]:
+    """Downloads finished.json and started.json of a Prow build concurrently.
+
+    Args:
+        bucket_name: The name of the GCS bucket.
+        prefix: The GCS path of the build directory.
+
+    Returns:
+        A ``(finished_json, started_json)`` tuple of parsed documents.
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        finished = executor.submit(
+            download_single_file_from_gcs, bucket_name, f"{prefix}/finished.json"
+        )
+        started = executor.submit(
+            download_single_file_from_gcs, bucket_name, f"{prefix}/started.json"
+        )
+        # json.loads detects the encoding of bytes itself; skip the decode copy
+        return json.loads(finished.result()), json.loads(started.result())
+
+
+HEX_DIGITS = frozenset("0123456789abcdef")
+# Digest and hex signature length for each signature header prefix GitHub
+# sends: "sha256" in X-Hub-Signature-256 and "sha1" in X-Hub-Signature.
+SIGNATURE_DIGESTS = {"sha256": (hashlib.sha256, 64), "sha1": (hashlib.sha1, 40)}
+# HMACs keyed with the secret once at import; verify_signature copies one per
+# request instead of re-deriving the key pads. Empty when no secret is set.
+HMAC_TEMPLATES = (
+    {
+        sha_name: hmac.new(GITHUB_SECRET_BYTES, digestmod=digestmod)
+        for sha_name, (digestmod, _) in SIGNATURE_DIGESTS.items()
+    }
+    if GITHUB_SECRET_BYTES
+    else {}
+)
+
+
 def verify_signature(payload, header_signature):
     """
     Verify the HMAC signature of the payload against the signature sent by GitHub.
@@ -43,12 +125,282 @@ def verify_signature(payload, header_signature):
     except ValueError:
         return False
 
-    if sha_name != "sha1":
+    if sha_name not in SIGNATURE_DIGESTS:
+        return False
+    hex_length = SIGNATURE_DIGESTS[sha_name][1]
+
+    # A well-formed signature is a fixed number of lowercase hex digits;
+    # anything else cannot match, so skip computing the HMAC
+    if len(signature) != hex_length or not HEX_DIGITS.issuperset(signature):
         return False
 
-    # Create the HMAC digest
-    mac = hmac.new(GITHUB_SECRET.encode("utf-8"), msg=payload, digestmod=hashlib.sha1)
-    return hmac.compare_digest(mac.hexdigest(), signature)
+    if not HMAC_TEMPLATES:
+        logger.error("GITHUB_SECRET is not set; rejecting signed webhook")
+        return False
+
+    # Create the HMAC digest and compare raw bytes rather than hex strings
+    mac = HMAC_TEMPLATES[sha_name].copy()
+    mac.update(payload)
+    return hmac.compare_digest(mac.digest(), bytes.fromhex(signature))
+
+
+# Webhook processing (GCS downloads, Logilica upload and its retries) runs
+# here so the HTTP handler can acknowledge GitHub immediately. The work is
+# almost all network waits, so the pool is sized well past the CPU count.
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "16"))
+executor = ThreadPoolExecutor(max_workers=WEBHOOK_WORKERS, thread_name_prefix="webhook")
+
+
+def _log_failure(future):
+    exception = future.exception()
+    if exception is not None:
+        logger.error("Background webhook processing failed: %s", exception)
+
+
+def submit_event(handler, payload):
+    """Queue ``handler(payload)`` on the background executor."""
+    future = executor.submit(handler, payload)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+# X-GitHub-Delivery IDs of recently accepted events, oldest first. GitHub
+# keeps the ID when it redelivers an event, so repeats can be dropped.
+# Tracked per process.
+MAX_SEEN_DELIVERIES = 4096
+seen_deliveries = collections.OrderedDict()
+seen_deliveries_lock = threading.Lock()
+
+
+def remember_delivery(delivery_id):
+    """Record a delivery ID; return False if it was already recorded."""
+    with seen_deliveries_lock:
+        if delivery_id in seen_deliveries:
+            return False
+        seen_deliveries[delivery_id] = None
+        if len(seen_deliveries) > MAX_SEEN_DELIVERIES:
+            seen_deliveries.popitem(last=False)
+        return True
+
+
+def forget_delivery(delivery_id):
+    with seen_deliveries_lock:
+        seen_deliveries.pop(delivery_id, None)
+
+
+def accept_event(handler, payload):
+    """Queue an event for processing unless its delivery was already accepted.
+
+    Returns the response for the webhook request.
+    """
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    if delivery_id is None:
+        submit_event(handler, payload)
+        return "", 202
+
+    if not remember_delivery(delivery_id):
+        logger.info("Ignoring duplicate delivery %s", delivery_id)
+        return "", 204
+
+    def forget_if_failed(future):
+        # Let a redelivery of a failed event be processed again
+        if future.exception() is not None:
+            forget_delivery(delivery_id)
+
+    submit_event(handler, payload).add_done_callback(forget_if_failed)
+    return "", 202
+
+
+# Retry policy for uploads made while processing webhook events.
+UPLOAD_MAX_ATTEMPTS = 5
+UPLOAD_MAX_BACKOFF = 30  # seconds, cap on a single wait
+UPLOAD_RETRY_DEADLINE = 60  # seconds, total time allowed for retries
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a failed upload is worth retrying.
+
+    Logilica is not known to deduplicate ingested builds, so a POST is only
+    retried when it cannot have been accepted: the connection failed or the
+    server answered with a retryable status. A read timeout is retried only
+    for the repository listing (a GET); a timed out POST may already have
+    created a build record.
+    """
+    # Also covers ConnectTimeout
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return True
+    if isinstance(error, requests.exceptions.ReadTimeout):
+        return error.request is not None and error.request.method == "GET"
+    return (
+        isinstance(error, requests.exceptions.HTTPError)
+        and error.response is not None
+        and error.response.status_code in RETRY_STATUS_CODES
+    )
+
+
+def upload_with_retry(**kwargs):
+    """Call upload_ci_build_data, retrying transient failures.
+
+    Waits grow exponentially with full jitter. Permanent errors (bad
+    request, unknown repository, missing token) are raised immediately.
+    """
+    deadline = time.monotonic() + UPLOAD_RETRY_DEADLINE
+    for attempt in range(1, UPLOAD_MAX_ATTEMPTS + 1):
+        try:
+            upload_ci_build_data(**kwargs)
+            logger.info(
+                "Attempt %d/%d: Upload successful.", attempt, UPLOAD_MAX_ATTEMPTS
+            )
+            return
+        except Exception as e:
+            logger.warning("Attempt %d/%d failed: %s", attempt, UPLOAD_MAX_ATTEMPTS, e)
+            delay = random.uniform(0, min(UPLOAD_MAX_BACKOFF, 0.5 * 2**attempt))
+            if (
+                attempt == UPLOAD_MAX_ATTEMPTS
+                or not _is_transient(e)
+                or time.monotonic() + delay > deadline
+            ):
+                logger.error("Giving up on upload.")
+                raise
+            logger.info("Retrying in %.1f seconds...", delay)
+            time.sleep(delay)
+
+
+# Splits a Prow view URL into the GCS bucket, the build's object prefix in
+# that bucket, and the job name and build ID at the end of the prefix.
+PROW_URL_RE = re.compile(
+    r"/gs/(?P<bucket>[^/]+)/(?P<prefix>(?:[^/]+/)*(?P<job>[^/]+)/(?P<build>[^/]+))/?$"
+)
+# The target URL comes from whoever posted the commit status, so build data
+# is only fetched from the OpenShift CI buckets
+PROW_GCS_BUCKETS = frozenset({"test-platform-results"})
+
+
+def process_status_event(payload):
+    """Download the Prow build data for a status event and upload it to Logilica."""
+    context = payload["context"]
+    logger.info(
+        "Processing Prow CI status event for context: %s, state: %s",
+        context,
+        payload["state"],
+    )
+    commit = payload["commit"]
+    commit_author = commit["commit"]["author"]
+    triggered_name = commit_author["name"]
+    triggered_email = commit_author["email"]
+    triggered_id = commit["author"]["login"]
+    target_url = payload["target_url"]
+
+    # Derive original_id and name_of_payload for Prow CI (status event)
+    # Assuming target_url is like https://prow.ci.openshift.org/view/gs/BUCKET/.../job-name/job-id
+    match = PROW_URL_RE.search(target_url)
+    if match is None:
+        raise ValueError(f"Unrecognized Prow target URL: {target_url}")
+    if match["bucket"] not in PROW_GCS_BUCKETS:
+        raise ValueError(f"Untrusted GCS bucket in target URL: {target_url}")
+    original_id_status = match["build"]
+    name_of_payload_status = "OpenShift CI " + match["job"].rpartition("-")[2]
+
+    logger.info("Downloading logs from %s", target_url)
+    bucket_name = match["bucket"]
+    new_source_prefix = match["prefix"]
+    finished_json, started_json = download_build_json(bucket_name, new_source_prefix)
+
+    upload_with_retry(
+        details_url=target_url,
+        conclusion=payload["state"],
+        started_at_epoch=started_json["timestamp"],
+        completed_at_epoch=finished_json["timestamp"],
+        repo_full_name=finished_json["metadata"]["repo"],
+        commit_sha=started_json.get("repo-commit", "unknown"),
+        triggered_name=triggered_name,
+        triggered_email=triggered_email,
+        triggered_id=triggered_id,
+        original_id=original_id_status,
+        name_of_payload=name_of_payload_status,
+    )
+
+
+def process_check_run_event(payload):
+    """Upload the build data of a completed Konflux CI check run to Logilica."""
+    check_run = payload["check_run"]
+    logger.info(
+        "Processing Konflux CI check_run event: %s, conclusion: %s",
+        check_run["name"],
+        check_run["conclusion"],
+    )
+
+    # Extract commit info from check_run
+    head_sha = check_run["head_sha"]
+
+    # Get commit details from repository
+    repo = payload["repository"]
+
+    # For now, just log the Konflux event - future: add specific processing
+    konflux_data = {
+        "name": check_run["name"],
+        "conclusion": check_run["conclusion"],
+        "started_at": check_run["started_at"],
+        "completed_at": check_run["completed_at"],
+        "details_url": check_run["details_url"],
+        "html_url": check_run["html_url"],
+        "head_sha": head_sha,
+        "repository": repo["full_name"],
+    }
+    logger.debug("Konflux CI data: %s", konflux_data)
+
+    # Extract and prepare data for upload_ci_build_data
+    konflux_conclusion = check_run["conclusion"]
+    # Convert ISO 8601 strings to epoch timestamps (fromisoformat accepts the
+    # trailing "Z" GitHub uses since Python 3.11)
+    started_at_dt = datetime.datetime.fromisoformat(check_run["started_at"])
+    completed_at_dt = datetime.datetime.fromisoformat(check_run["completed_at"])
+    konflux_started_at_epoch = int(started_at_dt.timestamp())
+    konflux_completed_at_epoch = int(completed_at_dt.timestamp())
+    konflux_repo_full_name = repo["full_name"]
+    konflux_commit_sha = head_sha
+    # For Konflux, 'triggered_name', 'triggered_email', 'triggered_id' might need to be derived
+    # from commit author/committer or a specific API call if not directly available.
+    # For now, using placeholder/derived values.
+    sender = payload["sender"]
+    konflux_triggered_name = sender["login"]
+    konflux_triggered_email = (
+        f"{sender['login']}@users.noreply.github.com"  # Placeholder
+    )
+    konflux_triggered_id = str(sender["id"])
+
+    # Derive original_id and name_of_payload for Konflux CI (check_run event)
+    # Using check_run id as original_id and check_run name for name_of_payload
+    konflux_original_id = str(check_run["id"])
+    konflux_name_of_payload = check_run["name"]
+
+    upload_with_retry(
+        details_url=check_run["details_url"],
+        conclusion=konflux_conclusion,
+        started_at_epoch=konflux_started_at_epoch,
+        completed_at_epoch=konflux_completed_at_epoch,
+        repo_full_name=konflux_repo_full_name,
+        commit_sha=konflux_commit_sha,
+        triggered_name=konflux_triggered_name,
+        triggered_email=konflux_triggered_email,
+        triggered_id=konflux_triggered_id,
+        original_id=konflux_original_id,
+        name_of_payload=konflux_name_of_payload,
+    )
+
+
+# Events github_webhook acts on; everything else is acknowledged and dropped
+HANDLED_EVENTS = frozenset({"ping", "status", "check_run"})
+
+# Body of the reply to GitHub's ping event, serialized once at import
+PONG_BODY = json.dumps({"msg": "Pong!"}).encode()
+# Prow status contexts whose builds are uploaded
+PROW_CONTEXTS = frozenset({"ci/prow/e2e", "ci/prow/e2e-tests"})
+# Outcomes that mark a finished build, for both status and check_run events
+FINAL_STATES = frozenset({"success", "failure"})
+# Konflux check runs link to a Konflux host, whatever its capitalization
+KONFLUX_URL_RE = re.compile("konflux", re.IGNORECASE)
 
 
 @app.route("/webhook", methods=["POST"])
@@ -58,15 +410,22 @@ def github_webhook():
 
     # Handle the 'ping' event for initial webhook setup *immediately*
     if event == "ping":
-        print("Received ping event, responding Pong!")
-        # Using make_response to have more control over the response
-        response = make_response(jsonify({"msg": "Pong!"}))
-        response.status_code = 200
-        response.content_type = "application/json"
-        return response
-
-    # If not a ping event, proceed with signature validation
-    header_signature = request.headers.get("X-Hub-Signature")
+        logger.info("Received ping event, responding Pong!")
+        # A fresh Response per request: Flask and Werkzeug mutate the returned
+        # object, so a single shared instance is not safe across threads
+        return Response(PONG_BODY, status=200, mimetype="application/json")
+
+    # Events we never process are acknowledged without reading the body
+    if event not in HANDLED_EVENTS:
+        logger.info("Unhandled event type: %s", event)
+        return "", 204
+
+    # Otherwise, proceed with signature validation
+    # Prefer the SHA-256 signature; X-Hub-Signature (SHA-1) is only used when
+    # a sender does not provide it
+    header_signature = request.headers.get("X-Hub-Signature-256")
+    if header_signature is None:
+        header_signature = request.headers.get("X-Hub-Signature")
     if header_signature is None:
         abort(400, "Signature missing")
 
@@ -75,192 +434,121 @@ def github_webhook():
 
     # Signature validated, parse payload for other events
     payload = request.get_json()
-    print("Received event:", event)
-    print("Payload:", json.dumps(payload, indent=2))
+    logger.info("Received event: %s", event)
+    logger.debug("Payload: %s", payload)
 
     # Process other events (like 'status')
     if event == "status":
         context = payload["context"]
-        if context in ["ci/prow/e2e", "ci/prow/e2e-tests"] and payload["state"] in (
-            "success",
-            "failure",
-        ):
-            print(
-                f"Processing Prow CI status event for context: {context}, state: {payload['state']}"
-            )
-            triggered_name = payload["commit"]["commit"]["author"]["name"]
-            triggered_email = payload["commit"]["commit"]["author"]["email"]
-            triggered_id = payload["commit"]["author"]["login"]
-            target_url = payload["target_url"]
-
-            # Derive original_id and name_of_payload for Prow CI (status event)
-            # Assuming target_url is like https://prow.ci.openshift.org/view/gs/.../job-name/job-id
-            original_id_status = target_url.split("/")[-1]
-            name_of_payload_raw_status = target_url.split("/")[-2]
-            name_of_payload_status = (
-                "OpenShift CI " + name_of_payload_raw_status.split("-")[-1]
-            )
-
-            print(f"Downloading logs from {target_url}")
-            bucket_name = "test-platform-results"
-            source_prefix = target_url.split("/gs/")[-1]
-            new_source_prefix = source_prefix.split("/", 1)[1]
-            finished_json = json.loads(
-                download_single_file_from_gcs(
-                    bucket_name, new_source_prefix + "/finished.json"
-                ).decode("utf-8")
-            )
-            started_json = json.loads(
-                download_single_file_from_gcs(
-                    bucket_name, new_source_prefix + "/started.json"
-                ).decode("utf-8")
-            )
+        if context in PROW_CONTEXTS and payload["state"] in FINAL_STATES:
+            return accept_event(process_status_event, payload)
 
-            max_retries = 7
-            retry_delay = 5  # seconds
-            for attempt in range(max_retries):
-                try:
-                    upload_ci_build_data(
-                        details_url=target_url,
-                        conclusion=payload["state"],
-                        started_at_epoch=started_json["timestamp"],
-                        completed_at_epoch=finished_json["timestamp"],
-                        repo_full_name=finished_json["metadata"]["repo"],
-                        commit_sha=started_json.get("repo-commit", "unknown"),
-                        triggered_name=triggered_name,
-                        triggered_email=triggered_email,
-                        triggered_id=triggered_id,
-                        original_id=original_id_status,
-                        name_of_payload=name_of_payload_status,
-                    )
-                    print(f"Attempt {attempt + 1}/{max_retries}: Upload successful.")
-                    break  # Exit loop if upload successful
-                except (
-                    requests.exceptions.RequestException,
-                    ValueError,
-                    Exception,
-                ) as e:
-                    print(f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}")
-                    if attempt < max_retries - 1:
-                        print(f"Retrying in {retry_delay} seconds...")
-                        time.sleep(retry_delay)
-                    else:
-                        print("All retry attempts failed.")
-                        # Re-raise the last exception to signal failure
-                        raise
+        logger.info(
+            "Unhandled status event - context: %s, state: %s",
+            payload.get("context"),
+            payload.get("state"),
+        )
 
     # Process check_run events (used by Konflux CI)
     elif event == "check_run":
         check_run = payload["check_run"]
-        if check_run["status"] == "completed" and check_run["conclusion"] in (
-            "success",
-            "failure",
-        ):
+        if (
+            check_run["status"] == "completed"
+            and check_run["conclusion"] in FINAL_STATES
             # Check if this is a Konflux CI check run
-            if (
+            and (
                 "Red Hat Konflux" in check_run["name"]
-                or "konflux" in check_run.get("details_url", "").lower()
-            ):
-                print(
-                    f"Processing Konflux CI check_run event: {check_run['name']}, conclusion: {check_run['conclusion']}"
-                )
-
-                # Extract commit info from check_run
-                head_sha = check_run["head_sha"]
-
-                # Get commit details from repository
-                repo = payload["repository"]
-
-                # For now, just log the Konflux event - future: add specific processing
-                konflux_data = {
-                    "name": check_run["name"],
-                    "conclusion": check_run["conclusion"],
-                    "started_at": check_run["started_at"],
-                    "completed_at": check_run["completed_at"],
-                    "details_url": check_run["details_url"],
-                    "html_url": check_run["html_url"],
-                    "head_sha": head_sha,
-                    "repository": repo["full_name"],
-                }
-                print(f"Konflux CI data: {json.dumps(konflux_data, indent=2)}")
-
-                # Extract and prepare data for upload_ci_build_data
-                konflux_conclusion = check_run["conclusion"]
-                # Convert ISO 8601 strings to epoch timestamps
-                started_at_dt = datetime.datetime.fromisoformat(
-                    check_run["started_at"].replace("Z", "+00:00")
-                )
-                completed_at_dt = datetime.datetime.fromisoformat(
-                    check_run["completed_at"].replace("Z", "+00:00")
-                )
-                konflux_started_at_epoch = int(started_at_dt.timestamp())
-                konflux_completed_at_epoch = int(completed_at_dt.timestamp())
-                konflux_repo_full_name = repo["full_name"]
-                konflux_commit_sha = head_sha
-                # For Konflux, 'triggered_name', 'triggered_email', 'triggered_id' might need to be derived
-                # from commit author/committer or a specific API call if not directly available.
-                # For now, using placeholder/derived values.
-                konflux_triggered_name = payload["sender"]["login"]
-                konflux_triggered_email = f"{payload['sender']['login']}@users.noreply.github.com"  # Placeholder
-                konflux_triggered_id = str(payload["sender"]["id"])
-
-                # Derive original_id and name_of_payload for Konflux CI (check_run event)
-                # Using check_run id as original_id and check_run name for name_of_payload
-                konflux_original_id = str(check_run["id"])
-                konflux_name_of_payload = check_run["name"]
-
-                max_retries = 7
-                retry_delay = 5  # seconds
-                for attempt in range(max_retries):
-                    try:
-                        upload_ci_build_data(
-                            details_url=check_run["details_url"],
-                            conclusion=konflux_conclusion,
-                            started_at_epoch=konflux_started_at_epoch,
-                            completed_at_epoch=konflux_completed_at_epoch,
-                            repo_full_name=konflux_repo_full_name,
-                            commit_sha=konflux_commit_sha,
-                            triggered_name=konflux_triggered_name,
-                            triggered_email=konflux_triggered_email,
-                            triggered_id=konflux_triggered_id,
-                            original_id=konflux_original_id,
-                            name_of_payload=konflux_name_of_payload,
-                        )
-                        print(
-                            f"Attempt {attempt + 1}/{max_retries}: Upload successful."
-                        )
-                        break  # Exit loop if upload successful
-                    except (
-                        requests.exceptions.RequestException,
-                        ValueError,
-                        Exception,
-                    ) as e:
-                        print(f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}")
-                        if attempt < max_retries - 1:
-                            print(f"Retrying in {retry_delay} seconds...")
-                            time.sleep(retry_delay)
-                        else:
-                            print("All retry attempts failed.")
-                            # Re-raise the last exception to signal failure
-                            raise
-
-    # Log unhandled events for debugging
-    if event == "status":
-        print(
-            f"Unhandled status event - context: {payload.get('context')}, state: {payload.get('state')}"
-        )
-    elif event == "check_run":
-        check_run = payload["check_run"]
-        print(
-            f"Unhandled check_run event - name: {check_run.get('name')}, status: {check_run.get('status')}, conclusion: {check_run.get('conclusion')}"
+                or KONFLUX_URL_RE.search(check_run.get("details_url") or "")
+            )
+        ):
+            return accept_event(process_check_run_event, payload)
+
+        logger.info(
+            "Unhandled check_run event - name: %s, status: %s, conclusion: %s",
+            check_run.get("name"),
+            check_run.get("status"),
+            check_run.get("conclusion"),
         )
-    else:
-        print(f"Unhandled event type: {event}")
 
-    # Respond with a 204 No Content status code once processing is complete
+    # Respond with a 204 No Content status code for events that need no work
     return "", 204
 
 
+# Keep-alive session shared by all Logilica calls. Transient failures of
+# idempotent requests (the repository listing) are retried by urllib3.
+logilica_session = requests.Session()
+logilica_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504]
+        ),
+    ),
+)
+
+# How long the Logilica repository name -> id map is reused before refetching.
+REPO_MAP_TTL = 300  # seconds
+# Upper bound on each Logilica request, so a stalled connection fails (and is
+# retried by upload_with_retry) instead of holding a worker thread forever.
+LOGILICA_TIMEOUT = 30  # seconds
+
+
+LOGILICA_REPOSITORIES_URL = "https://logilica.io/api/import/v1/repositories"
+LOGILICA_CI_BUILD_URL = "https://logilica.io/api/import/v1/ci_build/{}/create"
+
+
+def logilica_headers(token: str) -> dict:
+    """Build the Logilica import API request headers."""
+    return {
+        "Content-Type": "application/json",
+        "X-lgca-token": token,
+        "x-lgca-domain": "redhat",
+    }
+
+
+# The current repository map as a Future, and the REPO_MAP_TTL window it was
+# fetched in. The lock only guards swapping these two; the fetch itself runs
+# outside it, and concurrent uploads that miss together wait on the same
+# Future instead of each listing the repositories.
+repo_map_lock = threading.Lock()
+_repo_map_stamp = None
+_repo_map_future = None
+
+
+def _fetch_repo_map(headers: dict) -> dict:
+    """Fetch the Logilica repositories as a ``{name: id}`` map."""
+    response = logilica_session.get(
+        LOGILICA_REPOSITORIES_URL, headers=headers, timeout=LOGILICA_TIMEOUT
+    )
+    response.raise_for_status()
+    return {repo["name"]: repo["id"] for repo in response.json()}
+
+
+def get_repo_map(headers: dict) -> dict:
+    """Return the Logilica repository map, refetching it every REPO_MAP_TTL seconds."""
+    global _repo_map_stamp, _repo_map_future
+    stamp = int(time.time() // REPO_MAP_TTL)
+    with repo_map_lock:
+        future = _repo_map_future
+        refresh = _repo_map_stamp != stamp
+        if refresh:
+            future = Future()
+            _repo_map_stamp, _repo_map_future = stamp, future
+
+    if refresh:
+        try:
+            future.set_result(_fetch_repo_map(headers))
+        except Exception as e:
+            future.set_exception(e)
+            # Don't cache the failure; the next upload fetches again
+            with repo_map_lock:
+                if _repo_map_future is future:
+                    _repo_map_stamp = None
+    return future.result()
+
+
 # Based on https://docs.logilica.com/advanced/import/build-data
 def upload_ci_build_data(
     details_url: str,
@@ -276,37 +564,40 @@ def upload_ci_build_data(
     name_of_payload: str,
 ):
     try:
-        logilica_token = LOGILICA_TOKEN
-        if not logilica_token:
+        # Read per call, so the guard and the headers always use the same token
+        token = os.environ.get("LOGILICA_TOKEN")
+        if not token:
             raise ValueError("LOGILICA_TOKEN environment variable is not set")
-
-        logilica_domain = "redhat"
-        headers = {
-            "Content-Type": "application/json",
-            "X-lgca-token": logilica_token,
-            "x-lgca-domain": logilica_domain,
-        }
+        headers = logilica_headers(token)
 
         # Get repository ID
-        response = requests.get(
-            "https://logilica.io/api/import/v1/repositories", headers=headers
-        )
-        response.raise_for_status()
-
-        repo_id = ""
-        data = response.json()
-
-        for repo in data:
-            if repo["name"] == repo_full_name:
-                repo_id = repo["id"]
-                break
-
+        repo_id = get_repo_map(headers).get(repo_full_name)
         if not repo_id:
             raise ValueError(f"Repository {repo_full_name} not found in Logilica")
 
-        url = f"https://logilica.io/api/import/v1/ci_build/{repo_id}/create"
-
-        # Construct payload with actual data from the CI build
+        url = LOGILICA_CI_BUILD_URL.format(repo_id)
+
+        # Construct payload with actual data from the CI build. The build,
+        # its single stage and that stage's single job share name, timing and
+        # outcome, so the nested objects are built once and referenced.
+        conclusion_label = conclusion.capitalize()
+        job = {
+            "name": name_of_payload,
+            "startedAt": started_at_epoch,
+            "completedAt": completed_at_epoch,
+            "status": "Completed",
+            "conclusion": conclusion_label,
+        }
+        stage = {
+            "name": name_of_payload,
+            "id": original_id,
+            "url": details_url,
+            "startedAt": started_at_epoch,
+            "completedAt": completed_at_epoch,
+            "status": "Completed",
+            "conclusion": conclusion_label,
+            "jobs": [job],
+        }
         payload = [
             {
                 "origin": "OpenShift_CI",  # Can be updated to be dynamic if needed
@@ -323,45 +614,30 @@ def upload_ci_build_data(
                     "lastActivity": 1,
                 },
                 "status": "Completed",
-                "conclusion": conclusion.capitalize(),
+                "conclusion": conclusion_label,
                 "repoUrl": f"https://github.com/{repo_full_name}",
                 "commit": commit_sha,
                 "pullRequestUrls": [details_url],
                 "isDeployment": True,
-                "stages": [
-                    {
-                        "name": name_of_payload,
-                        "id": original_id,
-                        "url": details_url,
-                        "startedAt": started_at_epoch,
-                        "completedAt": completed_at_epoch,
-                        "status": "Completed",
-                        "conclusion": conclusion.capitalize(),
-                        "jobs": [
-                            {
-                                "name": name_of_payload,
-                                "startedAt": started_at_epoch,
-                                "completedAt": completed_at_epoch,
-                                "status": "Completed",
-                                "conclusion": conclusion.capitalize(),
-                            }
-                        ],
-                    }
-                ],
+                "stages": [stage],
             }
         ]
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = logilica_session.post(
+            url, headers=headers, json=payload, timeout=LOGILICA_TIMEOUT
+        )
         response.raise_for_status()
-        print("Successfully uploaded CI build data to Logilica")
+        logger.info("Successfully uploaded CI build data to Logilica")
 
     except requests.exceptions.RequestException as e:
-        print(f"Error making request to Logilica: {str(e)}")
+        logger.error("Error making request to Logilica: %s", e)
         raise
     except Exception as e:
-        print(f"Unexpected error in upload_ci_build_data: {str(e)}")
+        logger.error("Unexpected error in upload_ci_build_data: %s", e)
         raise
 
 
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=5001)
+    # Local development only; production runs under gunicorn (see Dockerfile)
+    configure_logging()
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1", host="0.0.0.0", port=5001)
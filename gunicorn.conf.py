@@ -0,0 +1,22 @@
+# Gunicorn settings for the webhook service, picked up automatically from the
+# working directory. Each worker runs a pool of threads so webhook deliveries
+# are accepted concurrently instead of queuing behind one another.
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5002")
+# Kept small and fixed rather than derived from os.cpu_count(), which reports
+# the node's CPUs inside a container. Each worker has its own webhook
+# executor (WEBHOOK_WORKERS threads), X-GitHub-Delivery dedup cache and
+# Logilica repository map, so redeliveries are only deduplicated when they
+# reach the same worker. Set WEB_CONCURRENCY to change it.
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = 120
+
+
+def post_worker_init(worker):
+    # app leaves logging configuration to its entry points
+    from app import configure_logging
+
+    configure_logging()
@@ -1,15 +1,56 @@
 #!/usr/bin/env python3
 import argparse
-import json
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-# Import the upload function from app.py
-from app import upload_ci_build_data
+# Reuse the GCS and upload helpers from app.py
+from app import (
+    PROW_GCS_BUCKETS,
+    PROW_URL_RE,
+    configure_logging,
+    download_build_json,
+    upload_ci_build_data,
+)
+
+# Keep-alive session for the GitHub API so the PR walk reuses connections
+# instead of opening a new TLS connection per request.
+github_session = requests.Session()
+github_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Pause the walk when fewer than this many GitHub API calls remain in the
+# current rate limit window, until the window resets. Requests already in
+# flight when a response crosses the floor still complete, so the floor has
+# to stay above the number of workers.
+RATE_LIMIT_FLOOR = 50
+# Epoch time before which no worker sends a request; set from
+# X-RateLimit-Reset by whichever worker first sees the floor crossed.
+resume_at = 0.0
+rate_limit_lock = threading.Lock()
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def repo_name(value: str) -> str:
+    """argparse type for --repo: a repository in 'owner/repo' form."""
+    owner, _, name = value.partition("/")
+    if not owner or not name or "/" in name:
+        raise argparse.ArgumentTypeError(
+            f"invalid repository '{value}', expected 'owner/repo'"
+        )
+    return value
 
 
 def configure_parser() -> argparse.ArgumentParser:
@@ -18,7 +59,10 @@ def configure_parser() -> argparse.ArgumentParser:
         description="Upload CI build data for old PRs in a given repository to Logilica"
     )
     parser.add_argument(
-        "--repo", required=True, help="Repository name in format 'owner/repo'"
+        "--repo",
+        required=True,
+        type=repo_name,
+        help="Repository name in format 'owner/repo'",
     )
     parser.add_argument(
         "--token",
@@ -38,6 +82,12 @@ def configure_parser() -> argparse.ArgumentParser:
         default="ci/prow/e2e",
         help="CI context to search for (default: ci/prow/e2e)",
     )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=8,
+        help="Number of PR batches to process concurrently (default: 8)",
+    )
     return parser
 
 
@@ -51,146 +101,166 @@ def get_github_token(args) -> str:
     return token
 
 
-def get_pr_data(repo: str, pr_number: int, token: str) -> Optional[Dict[str, Any]]:
-    """Fetch PR data from GitHub API."""
-    url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}"
-    headers = {
+def github_headers(token: str) -> Dict[str, str]:
+    """Build the GitHub REST API request headers."""
+    return {
         "Accept": "application/vnd.github+json",
         "Authorization": f"token {token}",
         "X-GitHub-Api-Version": "2022-11-28",
     }
 
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        print(f"Error fetching PR {pr_number}: {e}")
-        return None
 
-
-def get_pr_status(
-    repo: str, commit_sha: str, token: str, context: str
-) -> Optional[Dict[str, Any]]:
-    """Fetch status checks for a commit, filtering by context."""
-    url = f"https://api.github.com/repos/{repo}/commits/{commit_sha}/status"
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"token {token}",
-        "X-GitHub-Api-Version": "2022-11-28",
-    }
+def github_request(method: str, url: str, token: str, **kwargs) -> requests.Response:
+    """Call the GitHub API, pausing when the rate limit is nearly spent."""
+    global resume_at
+    # Wait out any pause another worker has started
+    delay = resume_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    response = github_session.request(
+        method, url, headers=github_headers(token), **kwargs
+    )
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    if remaining is not None and int(remaining) < RATE_LIMIT_FLOOR:
+        reset_at = int(response.headers.get("X-RateLimit-Reset", 0)) + 1
+        with rate_limit_lock:
+            if reset_at > resume_at:
+                resume_at = reset_at
+                print(
+                    "GitHub rate limit nearly exhausted, "
+                    f"pausing {max(0, reset_at - time.time()):.0f}s"
+                )
+    return response
+
+
+# Number of PRs requested per GraphQL query
+PR_BATCH_SIZE = 25
+
+PR_QUERY_FRAGMENT = """
+fragment PR on PullRequest {
+  author { login ... on User { email } }
+  commits(last: 1) {
+    nodes { commit { oid status { contexts { context state targetUrl } } } }
+  }
+}
+"""
+
+
+def fetch_prs_batch(
+    repo: str, pr_numbers: List[int], token: str
+) -> Dict[int, Optional[Dict[str, Any]]]:
+    """Fetch the author, head commit and statuses of several PRs in one query.
+
+    Returns a map from PR number to a dict with ``user``, ``head_sha`` and
+    ``statuses`` keys, or None for PRs that could not be fetched.
+    """
+    owner, name = repo.split("/", 1)
+    fields = " ".join(
+        f"pr{n}: pullRequest(number: {n}) {{ ...PR }}" for n in pr_numbers
+    )
+    query = (
+        "query($owner: String!, $name: String!) "
+        f"{{ repository(owner: $owner, name: $name) {{ {fields} }} }}"
+        + PR_QUERY_FRAGMENT
+    )
 
     try:
-        response = requests.get(url, headers=headers)
+        response = github_request(
+            "POST",
+            "https://api.github.com/graphql",
+            token,
+            json={"query": query, "variables": {"owner": owner, "name": name}},
+        )
         response.raise_for_status()
-        data = response.json()
-
-        # Find the specific context we're looking for
-        for status in data.get("statuses", []):
-            if status.get("context").startswith(context):
-                return status
-
-        return None
+        result = response.json()
     except requests.RequestException as e:
-        print(f"Error fetching status for commit {commit_sha}: {e}")
-        return None
-
-
-def fetch_gcs_json(gcs_path: str) -> Optional[Dict[str, Any]]:
-    """Fetch JSON data from Google Cloud Storage."""
-    # Extract bucket and object path from gs:// URL
-    if not gcs_path.startswith("gs://"):
-        print(f"Invalid GCS path: {gcs_path}")
-        return None
-
-    path_parts = gcs_path[5:].split("/", 1)
-    if len(path_parts) < 2:
-        print(f"Invalid GCS path format: {gcs_path}")
-        return None
-
-    bucket_name = path_parts[0]
-    source_blob_name = path_parts[1]
-
-    try:
-        # Use anonymous client to access public GCS buckets
-        from google.cloud import storage
-
-        storage_client = storage.Client.create_anonymous_client()
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(source_blob_name)
-        data = blob.download_as_bytes()
-        return json.loads(data.decode("utf-8"))
-    except Exception as e:
-        print(f"Error downloading from GCS: {str(e)}")
-        return None
+        print(f"Error fetching PRs {pr_numbers[0]}-{pr_numbers[-1]}: {e}")
+        return dict.fromkeys(pr_numbers)
+
+    # Unknown PR numbers come back as null fields alongside an error entry
+    for error in result.get("errors") or []:
+        print(f"GraphQL error: {error.get('message')}")
+    repository = (result.get("data") or {}).get("repository") or {}
+    prs = {}
+    for n in pr_numbers:
+        pr = repository.get(f"pr{n}")
+        commits = (pr or {}).get("commits", {}).get("nodes")
+        if not commits:
+            prs[n] = None
+            continue
+        commit = commits[0]["commit"]
+        prs[n] = {
+            "user": pr.get("author") or {},
+            "head_sha": commit["oid"],
+            "statuses": (commit.get("status") or {}).get("contexts", []),
+        }
+    return prs
 
 
-def process_pr(repo: str, pr_number: int, token: str, context: str) -> bool:
-    """Process a single PR and upload its CI data if available."""
+def process_pr(pr_number: int, pr_data: Optional[Dict[str, Any]], context: str) -> bool:
+    """Upload the CI data of a single PR if available."""
     print(f"Processing PR #{pr_number}...")
 
-    # Get PR data
-    pr_data = get_pr_data(repo, pr_number, token)
     if not pr_data:
         print(f"Skipping PR #{pr_number}: Could not fetch PR data")
         return False
 
-    # Get the head commit SHA
-    head_sha = pr_data.get("head", {}).get("sha")
-    if not head_sha:
-        print(f"Skipping PR #{pr_number}: No head commit found")
-        return False
+    head_sha = pr_data["head_sha"]
 
-    # Get status for this commit with the specified context
-    status = get_pr_status(repo, head_sha, token, context)
+    # Find the status with the specified context on the head commit
+    status = next(
+        (s for s in pr_data["statuses"] if s["context"].startswith(context)), None
+    )
     if not status:
         print(f"Skipping PR #{pr_number}: No '{context}' status found")
         return False
 
-    if status.get("state") not in ("success", "failure"):
-        print(
-            f"Skipping PR #{pr_number}: Status is '{status.get('state')}', need success or failure"
-        )
+    state = status["state"].lower()
+    if state not in ("success", "failure"):
+        print(f"Skipping PR #{pr_number}: Status is '{state}', need success or failure")
         return False
 
     # Get the target URL which should point to GCS data
-    target_url = status.get("target_url")
-    if not target_url or "/gs/" not in target_url:
+    target_url = status.get("targetUrl")
+    match = PROW_URL_RE.search(target_url) if target_url else None
+    if match is None:
         print(f"Skipping PR #{pr_number}: Invalid target URL")
         return False
-
-    # Extract GCS paths
-    gcs_path = target_url.split("/gs/")[-1]
-    bucket_name = gcs_path.split("/", 1)[0]
-    file_prefix = gcs_path.split("/", 1)[1]
+    if match["bucket"] not in PROW_GCS_BUCKETS:
+        print(f"Skipping PR #{pr_number}: Untrusted GCS bucket '{match['bucket']}'")
+        return False
 
     # Fetch finished.json and started.json
-    finished_json = fetch_gcs_json(f"gs://{bucket_name}/{file_prefix}/finished.json")
-    started_json = fetch_gcs_json(f"gs://{bucket_name}/{file_prefix}/started.json")
-
-    if not finished_json or not started_json:
-        print(f"Skipping PR #{pr_number}: Missing JSON data")
+    try:
+        finished_json, started_json = download_build_json(
+            match["bucket"], match["prefix"]
+        )
+    except Exception as e:
+        print(f"Skipping PR #{pr_number}: Missing JSON data ({e})")
         return False
 
     # Get author information
-    triggered_name = pr_data.get("user", {}).get("name") or pr_data.get("user", {}).get(
-        "login"
-    )
-    triggered_email = (
-        pr_data.get("user", {}).get("email")
-        or f"{triggered_name}@users.noreply.github.com"
-    )
-    triggered_id = pr_data.get("user", {}).get("login")
+    user = pr_data["user"]
+    # The login identifies the author, as with the REST user object; the
+    # public email is used when set, else the login's noreply address
+    triggered_id = user.get("login")
+    triggered_name = triggered_id
+    triggered_email = user.get("email") or f"{triggered_id}@users.noreply.github.com"
 
     # Upload data
     try:
         upload_ci_build_data(
-            target_url,
-            finished_json,
-            started_json,
-            triggered_name,
-            triggered_email,
-            triggered_id,
+            details_url=target_url,
+            conclusion=state,
+            started_at_epoch=started_json["timestamp"],
+            completed_at_epoch=finished_json["timestamp"],
+            repo_full_name=finished_json["metadata"]["repo"],
+            commit_sha=started_json.get("repo-commit", head_sha),
+            triggered_name=triggered_name,
+            triggered_email=triggered_email,
+            triggered_id=triggered_id,
+            original_id=match["build"],
+            name_of_payload="OpenShift CI " + match["job"].rpartition("-")[2],
         )
         print(f"✓ Successfully uploaded CI data for PR #{pr_number}")
         return True
@@ -199,9 +269,18 @@ def process_pr(repo: str, pr_number: int, token: str, context: str) -> bool:
         return False
 
 
+def process_batch(
+    repo: str, pr_numbers: List[int], token: str, context: str
+) -> List[bool]:
+    """Fetch a batch of PRs and process each; return per-PR success."""
+    prs = fetch_prs_batch(repo, pr_numbers, token)
+    return [process_pr(n, prs[n], context) for n in pr_numbers]
+
+
 def main():
     parser = configure_parser()
     args = parser.parse_args()
+    configure_logging()
 
     token = get_github_token(args)
     repo = args.repo
@@ -214,14 +293,9 @@ def main():
         latest_prs_url = (
             f"https://api.github.com/repos/{repo}/pulls?per_page=1&state=all"
         )
-        headers = {
-            "Accept": "application/vnd.github+json",
-            "Authorization": f"token {token}",
-            "X-GitHub-Api-Version": "2022-11-28",
-        }
 
         try:
-            response = requests.get(latest_prs_url, headers=headers)
+            response = github_request("GET", latest_prs_url, token)
             response.raise_for_status()
             prs = response.json()
             if prs:
@@ -236,13 +310,27 @@ def main():
     success_count = 0
     total_count = 0
 
-    for pr_num in range(start_pr, end_pr + 1):
-        total_count += 1
-        if process_pr(repo, pr_num, token, context):
-            success_count += 1
-
-        # Add a small delay to avoid rate limiting
-        time.sleep(0.5)
+    # PRs are fetched PR_BATCH_SIZE at a time and batches are independent,
+    # so several are processed at once; github_request throttles the walk
+    # when the rate limit runs low.
+    pr_numbers = list(range(start_pr, end_pr + 1))
+    batches = [
+        pr_numbers[i : i + PR_BATCH_SIZE]
+        for i in range(0, len(pr_numbers), PR_BATCH_SIZE)
+    ]
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(process_batch, repo, batch, token, context): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            total_count += len(batch)
+            # A batch that raises counts as failed; the others carry on
+            try:
+                success_count += sum(future.result())
+            except Exception as e:
+                print(f"✗ Failed to process PRs #{batch[0]}-#{batch[-1]}: {e}")
 
     print(f"\nCompleted processing {total_count} PRs")
     print(f"Successfully uploaded data for {success_count} PRs")
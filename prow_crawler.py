@@ -7,18 +7,50 @@ and uploads them to Logilica. It maintains a tracker file to avoid duplicate pro
 """
 
 import argparse
-import json
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse
 import re
 
-# Import the upload function from app.py
-from app import upload_ci_build_data, download_single_file_from_gcs
+# Import the upload and GCS download functions from app.py
+from app import configure_logging, upload_ci_build_data, download_build_json
+
+# Keep-alive session for Prow job history pages. Build files are fetched
+# through app.download_build_json, which has its own pooled session.
+prow_session = requests.Session()
+prow_session.mount(
+    "https://",
+    HTTPAdapter(
+        max_retries=Retry(
+            total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]
+        ),
+    ),
+)
+
+# Build IDs on the job history page are long numeric strings (at least 15 digits)
+BUILD_ID_RE = re.compile(r"\b\d{15,}\b")
+
+# Returned by fetch_job_history when the page has not changed since the ETag
+# saved by the last complete run
+NOT_MODIFIED = object()
+
+# Processed build IDs are appended to the tracker in batches of this size, so
+# an interrupted run loses at most this many entries
+TRACKER_FLUSH_EVERY = 25
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
 
 
 def configure_parser() -> argparse.ArgumentParser:
@@ -47,6 +79,12 @@ def configure_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Only show what would be processed without uploading",
     )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=8,
+        help="Number of builds to process concurrently (default: 8)",
+    )
     return parser
 
 
@@ -65,55 +103,78 @@ def get_tracker_file_path(tracker_dir: str, job_name: str) -> str:
     return os.path.join(tracker_dir, f"{job_name}.txt")
 
 
+def load_etag(etag_file: str) -> Optional[str]:
+    """Load the ETag of the last fully processed job history page."""
+    try:
+        with open(etag_file, "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: Could not read ETag file {etag_file}: {e}")
+        return None
+
+
+def save_etag(etag_file: str, etag: str):
+    """Store the job history page ETag, replacing the old one atomically."""
+    try:
+        tmp_file = f"{etag_file}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(f"{etag}\n")
+        os.replace(tmp_file, etag_file)
+    except Exception as e:
+        print(f"Error: Could not write ETag file {etag_file}: {e}")
+
+
 def load_processed_builds(tracker_file: str) -> Set[str]:
     """Load the set of already processed build IDs from tracker file."""
     if not os.path.exists(tracker_file):
         return set()
     
     try:
+        # Read in one go; split() drops blank lines and surrounding whitespace
         with open(tracker_file, "r") as f:
-            return set(line.strip() for line in f if line.strip())
+            return set(f.read().split())
     except Exception as e:
         print(f"Warning: Could not read tracker file {tracker_file}: {e}")
         return set()
 
 
-def save_processed_build(tracker_file: str, build_id: str):
-    """Append a build ID to the tracker file."""
+def save_processed_builds(tracker_file: str, build_ids: List[str]):
+    """Append build IDs to the tracker file in a single write."""
+    if not build_ids:
+        return
     try:
         with open(tracker_file, "a") as f:
-            f.write(f"{build_id}\n")
+            f.write("".join(f"{build_id}\n" for build_id in build_ids))
     except Exception as e:
         print(f"Error: Could not write to tracker file {tracker_file}: {e}")
 
 
-def fetch_job_history(job_url: str) -> Optional[str]:
-    """Fetch the job history page and return the HTML content."""
+def fetch_job_history(
+    job_url: str, etag: Optional[str] = None
+) -> Tuple[Any, Optional[str]]:
+    """Fetch the job history page.
+
+    Returns the HTML content and the page's ETag. If ``etag`` still matches,
+    the server sends no body and the content is NOT_MODIFIED.
+    """
+    headers = {"If-None-Match": etag} if etag else {}
     try:
-        response = requests.get(job_url, timeout=30)
+        response = prow_session.get(job_url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            return NOT_MODIFIED, etag
         response.raise_for_status()
-        return response.text
+        return response.text, response.headers.get("ETag")
     except requests.RequestException as e:
         print(f"Error fetching job history from {job_url}: {e}")
-        return None
+        return None, None
 
 
 def parse_build_ids_from_html(html_content: str) -> List[str]:
     """Parse build IDs from the job history HTML page."""
-    # Look for build IDs in table rows - they're typically long numeric strings
-    # Pattern matches long numeric IDs (at least 15 digits)
-    build_pattern = r'\b(\d{15,})\b'
-    matches = re.findall(build_pattern, html_content)
-    
     # Remove duplicates while preserving order
-    seen = set()
-    builds = []
-    for match in matches:
-        if match not in seen:
-            seen.add(match)
-            builds.append(match)
-    
-    return builds
+    return list(dict.fromkeys(BUILD_ID_RE.findall(html_content)))
 
 
 def construct_gcs_url(job_name: str, build_id: str) -> str:
@@ -128,16 +189,8 @@ def fetch_build_data(job_name: str, build_id: str) -> Optional[Dict[str, Any]]:
     base_path = f"logs/{job_name}/{build_id}"
     
     try:
-        # Download finished.json and started.json
-        finished_data = download_single_file_from_gcs(
-            bucket_name, f"{base_path}/finished.json"
-        )
-        started_data = download_single_file_from_gcs(
-            bucket_name, f"{base_path}/started.json"
-        )
-        
-        finished_json = json.loads(finished_data.decode("utf-8"))
-        started_json = json.loads(started_data.decode("utf-8"))
+        # Download finished.json and started.json concurrently
+        finished_json, started_json = download_build_json(bucket_name, base_path)
         
         return {
             "finished": finished_json,
@@ -194,9 +247,15 @@ def process_build(
     job_url: str,
     job_name: str, 
     build_id: str, 
+    triggered_info: Dict[str, str],
+    name_of_payload: str,
     dry_run: bool = False
 ) -> bool:
-    """Process a single build and upload its data."""
+    """Process a single build and upload its data.
+
+    ``triggered_info`` and ``name_of_payload`` depend only on the job, so
+    they are computed once per run by the caller.
+    """
     print(f"Processing build {build_id} for job {job_name}...")
     
     # Fetch build data
@@ -219,12 +278,6 @@ def process_build(
     started_at_epoch = started_json.get("timestamp", 0)
     completed_at_epoch = finished_json.get("timestamp", 0)
     
-    # Get triggered user info
-    triggered_info = get_triggered_info(job_name)
-    
-    # Derive name_of_payload similar to app.py logic
-    name_of_payload = f"OpenShift CI {job_name.split('-')[-1]}"
-    
     # Construct details_url from job_url and build_id
     # Convert job-history URL to view URL format
     # From: https://prow.ci.openshift.org/job-history/test-platform-results/logs/JOB_NAME
@@ -267,6 +320,7 @@ def process_build(
 def main():
     parser = configure_parser()
     args = parser.parse_args()
+    configure_logging()
     
     job_url = args.job_url.rstrip("/")
     tracker_dir = args.tracker_dir
@@ -289,14 +343,20 @@ def main():
     
     # Get tracker file path
     tracker_file = get_tracker_file_path(tracker_dir, job_name)
+    etag_file = tracker_file[: -len(".txt")] + ".etag"
     
     # Load already processed builds
     processed_builds = load_processed_builds(tracker_file)
     print(f"Already processed {len(processed_builds)} builds")
     
-    # Fetch job history page
-    html_content = fetch_job_history(job_url)
-    if not html_content:
+    # Fetch job history page, unless it is unchanged since the last run that
+    # processed every build on it
+    html_content, etag = fetch_job_history(job_url, load_etag(etag_file))
+    if html_content is NOT_MODIFIED:
+        print("Job history unchanged since last run")
+        print("No new builds to process")
+        return
+    if html_content is None:
         sys.exit("Error: Could not fetch job history page")
     
     # Parse build IDs from HTML
@@ -309,6 +369,8 @@ def main():
     
     if not new_builds:
         print("No new builds to process")
+        if etag and not dry_run:
+            save_etag(etag_file, etag)
         return
     
     # Limit the number of builds to process
@@ -316,19 +378,51 @@ def main():
     if len(builds_to_process) < len(new_builds):
         print(f"Processing {len(builds_to_process)} builds (limited by --limit)")
     
-    # Process builds
+    # Triggered user info and name_of_payload are the same for every build
+    # of the job; name_of_payload is derived similar to app.py logic
+    triggered_info = get_triggered_info(job_name)
+    name_of_payload = f"OpenShift CI {job_name.split('-')[-1]}"
+    
+    # Process builds concurrently; each build is fetched and uploaded on its
+    # own, and the tracker is only written from this thread as results arrive
     success_count = 0
-    for i, build_id in enumerate(builds_to_process, 1):
-        print(f"\n[{i}/{len(builds_to_process)}] Processing build {build_id}")
-        
-        if process_build(job_url, job_name, build_id, dry_run):
-            success_count += 1
-            if not dry_run:
-                save_processed_build(tracker_file, build_id)
-        
-        # Add delay to avoid overwhelming the services
-        if i < len(builds_to_process):
-            time.sleep(1)
+    pending = []
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = {
+                executor.submit(
+                    process_build,
+                    job_url,
+                    job_name,
+                    build_id,
+                    triggered_info,
+                    name_of_payload,
+                    dry_run,
+                ): build_id
+                for build_id in builds_to_process
+            }
+            for i, future in enumerate(as_completed(futures), 1):
+                build_id = futures[future]
+                print(f"[{i}/{len(builds_to_process)}] Finished build {build_id}")
+                
+                # A build that raises counts as failed; the others still get
+                # recorded in the tracker
+                try:
+                    succeeded = future.result()
+                except Exception as e:
+                    print(f"✗ Failed to process build {build_id}: {e}")
+                    succeeded = False
+                
+                if succeeded:
+                    success_count += 1
+                    if not dry_run:
+                        pending.append(build_id)
+                        if len(pending) >= TRACKER_FLUSH_EVERY:
+                            save_processed_builds(tracker_file, pending)
+                            pending = []
+    finally:
+        # Record whatever was uploaded, even if the run stops early
+        save_processed_builds(tracker_file, pending)
     
     print(f"\nCompleted processing {len(builds_to_process)} builds")
     print(f"Successfully processed: {success_count}")
@@ -336,6 +430,10 @@ def main():
     
     if not dry_run and success_count > 0:
         print(f"Tracker file updated: {tracker_file}")
+    
+    # Only skip this page next time if nothing on it is left to retry
+    if etag and not dry_run and success_count == len(new_builds):
+        save_etag(etag_file, etag)
 
 
 if __name__ == "__main__":
@@ -46,7 +46,6 @@ Examples:
 
 Environment Variables:
   LOGILICA_TOKEN           Required for uploading data to Logilica
-  GOOGLE_APPLICATION_CREDENTIALS  Path to GCS service account key (if needed)
 
 EOF
 }
@@ -73,11 +72,6 @@ run_container() {
         env_vars="$env_vars -e LOGILICA_TOKEN=$LOGILICA_TOKEN"
     fi
     
-    if [ ! -z "$GOOGLE_APPLICATION_CREDENTIALS" ]; then
-        env_vars="$env_vars -e GOOGLE_APPLICATION_CREDENTIALS=/app/gcs-key.json"
-        env_vars="$env_vars -v $GOOGLE_APPLICATION_CREDENTIALS:/app/gcs-key.json:ro"
-    fi
-    
     # Create local tracker directory if it doesn't exist
     mkdir -p ./tracker
     
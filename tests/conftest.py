@@ -0,0 +1,6 @@
+import os
+
+# app reads its configuration once at import, so the test values must be in
+# the environment before any test module imports it
+os.environ["GITHUB_SECRET"] = "test-secret"
+os.environ["LOGILICA_TOKEN"] = "test-logilica-token"
@@ -0,0 +1,247 @@
+import sys
+from unittest.mock import patch, MagicMock
+
+import pytest
+import requests
+
+import pr_uploader
+from pr_uploader import fetch_prs_batch, github_request, process_pr
+
+TARGET_URL = (
+    "https://prow.ci.openshift.org/view/gs/test-platform-results/"
+    "pr-logs/pull/org_repo/7/pull-ci-org-repo-master-e2e/1900000000000000001"
+)
+
+
+def graphql_response(payload):
+    """Helper function to build a mock GraphQL HTTP response."""
+    response = MagicMock()
+    response.json.return_value = payload
+    return response
+
+
+def pr_node(status=None, author=None):
+    """Helper function to build a PullRequest node as returned by the query."""
+    return {
+        "author": author,
+        "commits": {"nodes": [{"commit": {"oid": "abc123", "status": status}}]},
+    }
+
+
+# --- Tests for fetch_prs_batch ---
+
+
+@patch("pr_uploader.github_request")
+def test_fetch_prs_batch_parses_prs(mock_request):
+    """Test the author, head commit and statuses are extracted per PR."""
+    contexts = [{"context": "ci/prow/e2e", "state": "SUCCESS", "targetUrl": TARGET_URL}]
+    mock_request.return_value = graphql_response(
+        {
+            "data": {
+                "repository": {
+                    "pr1": pr_node(
+                        status={"contexts": contexts}, author={"login": "octocat"}
+                    )
+                }
+            }
+        }
+    )
+
+    prs = fetch_prs_batch("org/repo", [1], "token")
+
+    assert prs == {
+        1: {"user": {"login": "octocat"}, "head_sha": "abc123", "statuses": contexts}
+    }
+    assert mock_request.call_args.args[:2] == ("POST", "https://api.github.com/graphql")
+    assert mock_request.call_args.kwargs["json"]["variables"] == {
+        "owner": "org",
+        "name": "repo",
+    }
+
+
+@patch("pr_uploader.github_request")
+def test_fetch_prs_batch_null_pr(mock_request):
+    """Test PR numbers that resolve to null come back as None."""
+    mock_request.return_value = graphql_response(
+        {
+            "data": {"repository": {"pr1": pr_node(status=None), "pr2": None}},
+            "errors": [{"message": "Could not resolve to a PullRequest"}],
+        }
+    )
+
+    prs = fetch_prs_batch("org/repo", [1, 2], "token")
+
+    assert prs[2] is None
+    assert prs[1]["head_sha"] == "abc123"
+
+
+@patch("pr_uploader.github_request")
+def test_fetch_prs_batch_commit_without_status(mock_request):
+    """Test a head commit with no status, or no contexts, has no statuses."""
+    mock_request.return_value = graphql_response(
+        {
+            "data": {
+                "repository": {
+                    "pr1": pr_node(status=None),
+                    "pr2": pr_node(status={"contexts": []}),
+                }
+            }
+        }
+    )
+
+    prs = fetch_prs_batch("org/repo", [1, 2], "token")
+
+    assert prs[1] == {"user": {}, "head_sha": "abc123", "statuses": []}
+    assert prs[2] == {"user": {}, "head_sha": "abc123", "statuses": []}
+
+
+@patch("pr_uploader.github_request")
+def test_fetch_prs_batch_graphql_errors(mock_request, capsys):
+    """Test a query that fails as a whole returns None for every PR."""
+    mock_request.return_value = graphql_response(
+        {"data": None, "errors": [{"message": "Something went wrong"}]}
+    )
+
+    prs = fetch_prs_batch("org/repo", [1, 2, 3], "token")
+
+    assert prs == {1: None, 2: None, 3: None}
+    assert "Something went wrong" in capsys.readouterr().out
+
+
+@patch("pr_uploader.github_request")
+def test_fetch_prs_batch_request_error(mock_request):
+    """Test a failed request returns None for every PR."""
+    mock_request.side_effect = requests.exceptions.ConnectionError("boom")
+
+    assert fetch_prs_batch("org/repo", [1, 2], "token") == {1: None, 2: None}
+
+
+# --- Tests for process_pr ---
+
+
+@patch("pr_uploader.upload_ci_build_data")
+@patch("pr_uploader.download_build_json")
+def test_process_pr_identifies_author_by_login(mock_download, mock_upload):
+    """Test the author's login is sent as name, id and noreply address."""
+    mock_download.return_value = (
+        {"timestamp": 1700000100, "metadata": {"repo": "org/repo"}},
+        {"timestamp": 1700000000, "repo-commit": "abc123"},
+    )
+    pr_data = {
+        "user": {"login": "octocat", "email": ""},
+        "head_sha": "abc123",
+        "statuses": [
+            {"context": "ci/prow/e2e", "state": "FAILURE", "targetUrl": TARGET_URL}
+        ],
+    }
+
+    assert process_pr(7, pr_data, "ci/prow/e2e") is True
+
+    kwargs = mock_upload.call_args.kwargs
+    assert kwargs["triggered_name"] == "octocat"
+    assert kwargs["triggered_email"] == "octocat@users.noreply.github.com"
+    assert kwargs["triggered_id"] == "octocat"
+    assert kwargs["conclusion"] == "failure"
+    assert kwargs["original_id"] == "1900000000000000001"
+
+
+@patch("pr_uploader.upload_ci_build_data")
+@patch("pr_uploader.download_build_json")
+def test_process_pr_untrusted_bucket(mock_download, mock_upload):
+    """Test a status pointing at a bucket outside the allowlist is skipped."""
+    pr_data = {
+        "user": {"login": "octocat"},
+        "head_sha": "abc123",
+        "statuses": [
+            {
+                "context": "ci/prow/e2e",
+                "state": "SUCCESS",
+                "targetUrl": TARGET_URL.replace("test-platform-results", "other"),
+            }
+        ],
+    }
+
+    assert process_pr(7, pr_data, "ci/prow/e2e") is False
+
+    mock_download.assert_not_called()
+    mock_upload.assert_not_called()
+
+
+# --- Tests for github_request ---
+
+
+@patch("pr_uploader.time.sleep")
+@patch("pr_uploader.github_session.request")
+def test_github_request_pauses_every_worker_until_reset(
+    mock_request, mock_sleep, monkeypatch
+):
+    """Test a response below the floor delays the following requests to the reset."""
+    monkeypatch.setattr("pr_uploader.resume_at", 0.0)
+    monkeypatch.setattr("pr_uploader.time.time", lambda: 1000.0)
+    mock_request.return_value.headers = {
+        "X-RateLimit-Remaining": "10",
+        "X-RateLimit-Reset": "1060",
+    }
+
+    github_request("GET", "https://api.github.com/x", "token")
+    mock_sleep.assert_not_called()
+    assert pr_uploader.resume_at == 1061
+
+    github_request("GET", "https://api.github.com/x", "token")
+    mock_sleep.assert_called_once_with(61.0)
+
+
+# --- Tests for main ---
+
+
+@patch("pr_uploader.process_batch")
+def test_main_failed_batch_does_not_abort_walk(mock_process_batch, monkeypatch, capsys):
+    """Test a batch that raises is counted as failed and the others still count."""
+    monkeypatch.setattr("pr_uploader.PR_BATCH_SIZE", 2)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["pr_uploader.py", "--repo", "org/repo", "--token", "t", "--end-pr", "6"],
+    )
+
+    def process_batch(repo, pr_numbers, token, context):
+        if pr_numbers[0] == 3:
+            raise ValueError("unexpected response")
+        return [True] * len(pr_numbers)
+
+    mock_process_batch.side_effect = process_batch
+
+    pr_uploader.main()
+
+    out = capsys.readouterr().out
+    assert "Failed to process PRs #3-#4: unexpected response" in out
+    assert "Completed processing 6 PRs" in out
+    assert "Successfully uploaded data for 4 PRs" in out
+
+
+@pytest.mark.parametrize("repo", ["repo", "org/", "/repo", "org/repo/extra"])
+def test_main_rejects_malformed_repo(repo, monkeypatch, capsys):
+    """Test --repo must be in owner/repo form."""
+    monkeypatch.setattr(sys, "argv", ["pr_uploader.py", "--repo", repo, "--token", "t"])
+
+    with pytest.raises(SystemExit) as excinfo:
+        pr_uploader.main()
+
+    assert excinfo.value.code == 2
+    assert "expected 'owner/repo'" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("workers", ["0", "-1"])
+def test_main_rejects_non_positive_workers(workers, monkeypatch, capsys):
+    """Test --workers below 1 is a usage error rather than a traceback."""
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["pr_uploader.py", "--repo", "org/repo", "--token", "t", "--workers", workers],
+    )
+
+    with pytest.raises(SystemExit) as excinfo:
+        pr_uploader.main()
+
+    assert excinfo.value.code == 2
+    assert "must be a positive integer" in capsys.readouterr().err
@@ -0,0 +1,226 @@
+import sys
+from unittest.mock import patch
+
+import pytest
+
+import prow_crawler
+
+JOB_NAME = "periodic-ci-org-repo-master-e2e"
+JOB_URL = (
+    "https://prow.ci.openshift.org/job-history/test-platform-results/logs/" + JOB_NAME
+)
+BUILD_IDS = [f"1900000000000000{i:03d}" for i in range(5)]
+
+
+def build_data(build_id, repos=None):
+    """Helper function to build a fetch_build_data result."""
+    return {
+        "finished": {
+            "result": "SUCCESS",
+            "timestamp": 1700000100,
+            "metadata": {"repos": {"org/repo": "master"} if repos is None else repos},
+        },
+        "started": {"timestamp": 1700000000, "repo-commit": "abc123"},
+        "gcs_url": prow_crawler.construct_gcs_url(JOB_NAME, build_id),
+        "build_id": build_id,
+        "job_name": JOB_NAME,
+    }
+
+
+def history_page(build_ids):
+    """Helper function to build a job history page listing build_ids."""
+    return "".join(
+        f'<a href="/view/gs/{build_id}">{build_id}</a>' for build_id in build_ids
+    )
+
+
+def run_main(monkeypatch, tracker_dir, *args):
+    """Run the crawler's main() for JOB_URL with the given extra arguments."""
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["prow_crawler.py", "--job-url", JOB_URL, "--tracker-dir", str(tracker_dir)]
+        + list(args),
+    )
+    prow_crawler.main()
+
+
+def tracked_builds(tracker_dir):
+    return prow_crawler.load_processed_builds(str(tracker_dir / f"{JOB_NAME}.txt"))
+
+
+@patch("prow_crawler.upload_ci_build_data")
+@patch("prow_crawler.fetch_build_data")
+@patch("prow_crawler.fetch_job_history")
+def test_main_build_error_does_not_abort_run(
+    mock_fetch_history, mock_fetch_build, mock_upload, monkeypatch, tmp_path
+):
+    """Test a build that raises is counted as failed and the rest are tracked."""
+    bad_build = BUILD_IDS[2]
+    mock_fetch_history.return_value = (history_page(BUILD_IDS), None)
+    # finished.json without metadata.repos makes extract_repo_info raise
+    mock_fetch_build.side_effect = lambda job_name, build_id: (
+        {**build_data(build_id), "finished": {"result": "SUCCESS"}}
+        if build_id == bad_build
+        else build_data(build_id)
+    )
+
+    run_main(monkeypatch, tmp_path)
+
+    assert mock_upload.call_count == len(BUILD_IDS) - 1
+    assert tracked_builds(tmp_path) == set(BUILD_IDS) - {bad_build}
+
+
+def etag_file(tracker_dir):
+    return tracker_dir / f"{JOB_NAME}.etag"
+
+
+# --- Tests for the job history ETag ---
+
+
+def test_save_and_load_etag(tmp_path):
+    """Test an ETag round-trips through the ETag file."""
+    path = str(tmp_path / "job.etag")
+    assert prow_crawler.load_etag(path) is None
+
+    prow_crawler.save_etag(path, '"abc"')
+
+    assert prow_crawler.load_etag(path) == '"abc"'
+
+
+@patch("prow_crawler.prow_session.get")
+def test_fetch_job_history_not_modified(mock_get):
+    """Test a 304 reply returns NOT_MODIFIED and keeps the sent ETag."""
+    mock_get.return_value.status_code = 304
+
+    content, etag = prow_crawler.fetch_job_history(JOB_URL, '"abc"')
+
+    assert content is prow_crawler.NOT_MODIFIED
+    assert etag == '"abc"'
+    assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": '"abc"'}
+
+
+@patch("prow_crawler.prow_session.get")
+def test_fetch_job_history_returns_etag(mock_get):
+    """Test a 200 reply returns the page and its new ETag."""
+    mock_get.return_value.status_code = 200
+    mock_get.return_value.text = "<html></html>"
+    mock_get.return_value.headers = {"ETag": '"def"'}
+
+    content, etag = prow_crawler.fetch_job_history(JOB_URL)
+
+    assert (content, etag) == ("<html></html>", '"def"')
+    assert mock_get.call_args.kwargs["headers"] == {}
+
+
+@patch("prow_crawler.upload_ci_build_data")
+@patch("prow_crawler.fetch_build_data")
+@patch("prow_crawler.fetch_job_history")
+def test_main_saves_etag_when_all_builds_succeed(
+    mock_fetch_history, mock_fetch_build, mock_upload, monkeypatch, tmp_path
+):
+    """Test the page ETag is stored once every new build has been uploaded."""
+    mock_fetch_history.return_value = (history_page(BUILD_IDS), '"v2"')
+    mock_fetch_build.side_effect = lambda job_name, build_id: build_data(build_id)
+
+    run_main(monkeypatch, tmp_path)
+
+    assert mock_upload.call_count == len(BUILD_IDS)
+    assert prow_crawler.load_etag(str(etag_file(tmp_path))) == '"v2"'
+
+
+@patch("prow_crawler.upload_ci_build_data")
+@patch("prow_crawler.fetch_build_data")
+@patch("prow_crawler.fetch_job_history")
+def test_main_not_modified_skips_crawl(
+    mock_fetch_history, mock_fetch_build, mock_upload, monkeypatch, tmp_path
+):
+    """Test an unchanged job history page ends the run before any build is fetched."""
+    prow_crawler.save_etag(str(etag_file(tmp_path)), '"v1"')
+    mock_fetch_history.return_value = (prow_crawler.NOT_MODIFIED, '"v1"')
+
+    run_main(monkeypatch, tmp_path)
+
+    assert mock_fetch_history.call_args.args == (JOB_URL, '"v1"')
+    mock_fetch_build.assert_not_called()
+    mock_upload.assert_not_called()
+
+
+@patch("prow_crawler.upload_ci_build_data")
+@patch("prow_crawler.fetch_build_data")
+@patch("prow_crawler.fetch_job_history")
+def test_main_partial_failure_keeps_old_etag(
+    mock_fetch_history, mock_fetch_build, mock_upload, monkeypatch, tmp_path
+):
+    """Test the ETag is not advanced while a build on the page still needs a retry."""
+    prow_crawler.save_etag(str(etag_file(tmp_path)), '"v1"')
+    mock_fetch_history.return_value = (history_page(BUILD_IDS), '"v2"')
+    mock_fetch_build.side_effect = lambda job_name, build_id: (
+        None if build_id == BUILD_IDS[0] else build_data(build_id)
+    )
+
+    run_main(monkeypatch, tmp_path)
+
+    assert mock_upload.call_count == len(BUILD_IDS) - 1
+    assert prow_crawler.load_etag(str(etag_file(tmp_path))) == '"v1"'
+    assert tracked_builds(tmp_path) == set(BUILD_IDS[1:])
+
+
+# --- Tests for batched tracker writes ---
+
+
+@patch("prow_crawler.save_processed_builds", wraps=prow_crawler.save_processed_builds)
+@patch("prow_crawler.upload_ci_build_data")
+@patch("prow_crawler.fetch_build_data")
+@patch("prow_crawler.fetch_job_history")
+def test_main_writes_tracker_in_batches(
+    mock_fetch_history,
+    mock_fetch_build,
+    mock_upload,
+    mock_save,
+    monkeypatch,
+    tmp_path,
+):
+    """Test processed builds are appended TRACKER_FLUSH_EVERY at a time."""
+    monkeypatch.setattr("prow_crawler.TRACKER_FLUSH_EVERY", 2)
+    mock_fetch_history.return_value = (history_page(BUILD_IDS), None)
+    mock_fetch_build.side_effect = lambda job_name, build_id: build_data(build_id)
+
+    run_main(monkeypatch, tmp_path)
+
+    assert [len(call.args[1]) for call in mock_save.call_args_list] == [2, 2, 1]
+    assert tracked_builds(tmp_path) == set(BUILD_IDS)
+
+
+@patch("prow_crawler.upload_ci_build_data")
+@patch("prow_crawler.fetch_build_data")
+@patch("prow_crawler.fetch_job_history")
+def test_main_interrupted_run_keeps_flushed_builds(
+    mock_fetch_history, mock_fetch_build, mock_upload, monkeypatch, tmp_path
+):
+    """Test builds already flushed to the tracker survive an interrupted run."""
+    monkeypatch.setattr("prow_crawler.TRACKER_FLUSH_EVERY", 2)
+    builds = BUILD_IDS[:3]
+    mock_fetch_history.return_value = (history_page(builds), None)
+    mock_fetch_build.side_effect = lambda job_name, build_id: build_data(build_id)
+
+    def upload(**kwargs):
+        if kwargs["original_id"] == builds[2]:
+            raise KeyboardInterrupt
+
+    mock_upload.side_effect = upload
+
+    with pytest.raises(KeyboardInterrupt):
+        run_main(monkeypatch, tmp_path, "--workers", "1")
+
+    assert tracked_builds(tmp_path) == set(builds[:2])
+
+
+@pytest.mark.parametrize("workers", ["0", "-1"])
+def test_main_rejects_non_positive_workers(workers, monkeypatch, tmp_path, capsys):
+    """Test --workers below 1 is a usage error rather than a traceback."""
+    with pytest.raises(SystemExit) as excinfo:
+        run_main(monkeypatch, tmp_path, "--workers", workers)
+
+    assert excinfo.value.code == 2
+    assert "must be a positive integer" in capsys.readouterr().err
@@ -2,31 +2,35 @@ import json
 import hmac
 import hashlib
 import os
+import pytest
 from app import app
 
-# Use the same test secret that's set in test_app.py
-# (which sets os.environ['GITHUB_SECRET'] = 'test-secret')
-SECRET = os.environ.get("GITHUB_SECRET", "test-secret")
+# The test secret is set in conftest.py
+SECRET = os.environ["GITHUB_SECRET"]
 
 
 def generate_signature(payload):
     return (
-        "sha1="
+        "sha256="
         + hmac.new(
-            SECRET.encode(), json.dumps(payload).encode(), hashlib.sha1
+            SECRET.encode(), json.dumps(payload).encode(), hashlib.sha256
         ).hexdigest()
     )
 
 
-def test_webhook():
-    client = app.test_client()
+@pytest.fixture(scope="session")
+def client():
+    return app.test_client()
+
+
+def test_webhook(client):
     payload = {"zen": "Keep it simple"}
     signature = generate_signature(payload)
 
     response = client.post(
         "/webhook",
         json=payload,
-        headers={"X-Hub-Signature": signature, "X-GitHub-Event": "ping"},
+        headers={"X-Hub-Signature-256": signature, "X-GitHub-Event": "ping"},
     )
     assert response.status_code == 200
 